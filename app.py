@@ -1,87 +1,114 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.middleware.proxy_fix import ProxyFix
 from bson import ObjectId
-from dotenv import load_dotenv
 import os
 from extensions import db, User, calculate_simple_interest
+from security import allow_attempt, hash_password, verify_password, needs_rehash, HashBusy
+import projections
+import inbox
 from werkzeug.utils import escape
 from datetime import datetime
 
-# Load environment variables
-load_dotenv()
-
-# Initialize Flask app
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key')
-app.config['UPLOAD_FOLDER'] = 'static/uploads'
-
-# ...existing code...
-
-
-from flask import Flask, render_template, request, redirect, url_for, flash, session
-from flask_login import LoginManager, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from bson import ObjectId
-from dotenv import load_dotenv
-import os
-from extensions import db, User, calculate_simple_interest
-from werkzeug.utils import escape
-from datetime import datetime
-
-# Load environment variables
-load_dotenv()
-
-# Initialize Flask app
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key')
-app.config['UPLOAD_FOLDER'] = 'static/uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-# Security: Set secure cookie flags for production
-app.config['SESSION_COOKIE_SECURE'] = True
-app.config['SESSION_COOKIE_HTTPONLY'] = True
-app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+# Defaults; anything passed to create_app(config) overrides these
+DEFAULT_CONFIG = {
+    'SECRET_KEY': os.getenv('SECRET_KEY', 'your-secret-key'),
+    'UPLOAD_FOLDER': 'static/uploads',
+    'MAX_CONTENT_LENGTH': 16 * 1024 * 1024,  # 16MB max file size
+    # Security: Set secure cookie flags for production
+    'SESSION_COOKIE_SECURE': True,
+    'SESSION_COOKIE_HTTPONLY': True,
+    'SESSION_COOKIE_SAMESITE': 'Lax',
+    # Trust X-Forwarded-For from this many proxies so rate limits see the real client IP
+    'TRUSTED_PROXIES': int(os.getenv('TRUSTED_PROXIES', 0)),
+    'MONGODB_URI': os.getenv('MONGODB_URI') or os.getenv('MONGO_URI', 'mongodb://localhost:27017/'),
+    'DB_NAME': os.getenv('DB_NAME', 'investment_db'),
+}
 
 # Initialize Flask-Login
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-# Create upload folder if it doesn't exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
 @login_manager.user_loader
 def load_user(user_id):
     user_data = db.users.find_one({'_id': ObjectId(user_id)})
     return User(user_data) if user_data else None
 
+def create_app(config=None):
+    """
+    Application factory. ``config`` is a mapping or object of Flask settings.
+    Nothing here touches MongoDB or imports pandas/numpy/pyarrow; the database
+    connects on first query and the heavy libraries load in the routes that use them.
+    """
+    app = Flask(__name__)
+    app.config.from_mapping(DEFAULT_CONFIG)
+    if isinstance(config, dict):
+        app.config.from_mapping(config)
+    elif config is not None:
+        app.config.from_object(config)
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
+
+    db.configure(app.config['MONGODB_URI'], app.config['DB_NAME'])
+    login_manager.init_app(app)
+
+    # Create upload folder if it doesn't exist
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    register_routes(app)
+    from routes.transactions import bp as transactions_bp
+    from routes.admin import bp as admin_bp
+    from routes.api import bp as api_bp
+    app.register_blueprint(transactions_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(api_bp)
+    return app
+
+def register_routes(app):
+    """Attach the top-level routes; endpoint names are the view function names."""
+    app.add_url_rule('/', view_func=home)
+    app.add_url_rule('/register', view_func=register, methods=['GET', 'POST'])
+    app.add_url_rule('/login', view_func=login, methods=['GET', 'POST'])
+    app.add_url_rule('/logout', view_func=logout)
+    app.add_url_rule('/help', view_func=help_page)
+    app.add_url_rule('/contact', view_func=contact, methods=['GET', 'POST'])
+    app.add_url_rule('/dashboard', view_func=dashboard)
+    app.add_url_rule('/dashboard/projection', view_func=projection)
+    app.add_url_rule('/wallet', view_func=wallet)
+    app.add_url_rule('/history', view_func=history)
+    app.add_url_rule('/article/<int:article_id>', view_func=article)
+
 # from flask_wtf import CSRFProtect
 # csrf = CSRFProtect(app)
 # Routes
-@app.route('/')
 def home():
     return render_template('index.html')
 
-@app.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
+        if not allow_attempt('register', request.remote_addr):
+            flash('Too many registration attempts. Please try again later.')
+            return render_template('register.html'), 429
         user = {
             'full_name': request.form['full_name'],
             'email': request.form['email'],
             'phone': request.form['phone'],
-            'password': generate_password_hash(request.form['password']),
             'is_admin': False,
             'created_at': datetime.utcnow()
         }
         if db.users.find_one({'email': user['email']}):
             flash('Email already registered')
             return redirect(url_for('register'))
+        # Hash only once the email is known to be free
+        try:
+            user['password'] = hash_password(request.form['password'])
+        except HashBusy:
+            flash('Server is busy. Please try again in a moment.')
+            return render_template('register.html'), 503
         db.users.insert_one(user)
         flash('Registration successful. Please login.')
         return redirect(url_for('login'))
     return render_template('register.html')
 
-@app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         email = request.form.get('email', '').strip()
@@ -90,8 +117,24 @@ def login():
             # Missing fields
             error = 'Missing email or password.'
             return render_template('login.html', error=error), 400
+        # Throttle before any DB lookup or hashing
+        if not allow_attempt('login', request.remote_addr, email):
+            error = 'Too many login attempts. Please try again later.'
+            return render_template('login.html', error=error), 429
         user_data = db.users.find_one({'email': email})
-        if user_data and check_password_hash(user_data['password'], password):
+        try:
+            valid = user_data and verify_password(user_data['password'], password)
+        except HashBusy:
+            error = 'Server is busy. Please try again in a moment.'
+            return render_template('login.html', error=error), 503
+        if valid and needs_rehash(user_data['password']):
+            try:
+                new_hash = hash_password(password)
+            except HashBusy:
+                pass  # Upgrade on a later login; a correct password is never refused for it
+            else:
+                db.users.update_one({'_id': user_data['_id']}, {'$set': {'password': new_hash}})
+        if valid:
             user = User(user_data)
             login_user(user)
             flash('Login successful!')
@@ -101,18 +144,15 @@ def login():
         return render_template('login.html', error=error), 401
     return render_template('login.html', error=None)
 
-@app.route('/logout')
 @login_required
 def logout():
     logout_user()
     flash('Logged out successfully.')
     return redirect(url_for('login'))
 
-@app.route('/help')
 def help_page():
     return render_template('help.html')
 
-@app.route('/contact', methods=['GET', 'POST'])
 def contact():
     if request.method == 'POST':
         name = escape(request.form.get('name', '').strip())
@@ -121,8 +161,8 @@ def contact():
         if not name or not email or not message:
             flash('All fields are required.')
             return render_template('contact.html')
-        # Save to DB (secure, no email sent)
-        db.contacts.insert_one({
+        # Queue for a batched write (secure, no email sent); repeats are deduped
+        inbox.submit({
             'name': name,
             'email': email,
             'message': message,
@@ -132,119 +172,63 @@ def contact():
         return render_template('contact.html')
     return render_template('contact.html')
 
-@app.route('/dashboard')
+# Dashboard, wallet and history render shells; main.js fills them from the /api/v1 endpoints
 @login_required
 def dashboard():
     if current_user.user_data.get('is_admin'):
         return redirect(url_for('admin.dashboard'))
-    deposits = list(db.deposits.find({'user_id': ObjectId(current_user.id)}))
-    withdrawals = list(db.withdrawals.find({'user_id': ObjectId(current_user.id)}))
-
-    # Calculate wallet balance (approved deposits - approved withdrawals + real-time interest)
-    total_deposit = sum(d['amount'] for d in deposits if d.get('status') == 'approved')
-    total_withdrawal = sum(w['amount'] for w in withdrawals if w.get('status') == 'approved')
-
-    # Real-time interest calculation for each approved deposit (by days)
-    from datetime import datetime as dt
-    now = dt.utcnow()
-    real_time_interest = 0
-    for d in deposits:
-        if d.get('status') == 'approved':
-            # Use up-to-date interest rate from settings for each deposit
-            settings = db.settings.find_one() or {'interest_rate': 8.0}
-            rate = settings.get('interest_rate', 8.0)
-            principal = d.get('amount', 0)
-            start = d.get('submitted_at')
-            days = d.get('duration_days', 0)
-            if start:
-                elapsed = (now - start).days
-                elapsed = min(elapsed, days)
-                # Fix: Calculate interest as annualized, by days
-                real_time_interest += (principal * rate * (elapsed/365)) / 100
-
-
-    wallet_balance = real_time_interest
-
-    # Transaction history: combine deposits and withdrawals, sort by date
-    history = []
-    for d in deposits:
-        h = dict(type='Deposit', amount=d['amount'], status=d.get('status'), date=d.get('submitted_at'), note=d.get('note', ''), id=str(d.get('_id')))
-        history.append(h)
-    for w in withdrawals:
-        h = dict(type='Withdrawal', amount=w['amount'], status=w.get('status'), date=w.get('requested_at'), note=w.get('note', ''), id=str(w.get('_id')))
-        history.append(h)
-    history.sort(key=lambda x: x['date'], reverse=True)
-
-    return render_template('dashboard.html', deposits=deposits, withdrawals=withdrawals, wallet_balance=wallet_balance, real_time_interest=real_time_interest, total_deposit=total_deposit, total_withdrawal=total_withdrawal, history=history)
+    return render_template('dashboard.html')
+
+@login_required
+def projection():
+    if current_user.user_data.get('is_admin'):
+        return jsonify(error='Not available for admin accounts'), 403
+    step = request.args.get('step', 'daily')
+    if step not in projections.STEPS:
+        return jsonify(error='step must be daily or monthly'), 400
+    try:
+        horizon = min(max(int(request.args.get('horizon', 365)), 0), projections.MAX_HORIZON_DAYS)
+    except ValueError:
+        return jsonify(error='horizon must be a number of days'), 400
+
+    settings = db.settings.find_one() or {'interest_rate': projections.DEFAULT_RATE}
+    rate = settings.get('interest_rate', projections.DEFAULT_RATE)
+    deposits = db.deposits.find(
+        {'user_id': ObjectId(current_user.id), 'status': 'approved'},
+        {'amount': 1, 'duration_days': 1, 'submitted_at': 1}
+    )
+    dates, interest = projections.user_projection(deposits, rate, datetime.utcnow(), horizon, step)
+    return jsonify(
+        rate=rate,
+        step=step,
+        dates=[d.isoformat() for d in dates],
+        interest=[round(v, 2) for v in interest.tolist()]
+    )
 
 # Wallet page
-@app.route('/wallet')
 @login_required
 def wallet():
     if current_user.user_data.get('is_admin'):
         return redirect(url_for('admin.dashboard'))
-    deposits = list(db.deposits.find({'user_id': ObjectId(current_user.id)}))
-    # withdrawals and totals are not needed for withdrawable balance, but keep for display
-    withdrawals = list(db.withdrawals.find({'user_id': ObjectId(current_user.id)}))
-    total_deposit = sum(d['amount'] for d in deposits if d.get('status') == 'approved')
-    total_withdrawal = sum(w['amount'] for w in withdrawals if w.get('status') == 'approved')
-    from datetime import datetime as dt
-    now = dt.utcnow()
-    # Calculate daily interest (principal * rate / 100) * days since deposit
-    real_time_interest = 0
-    for d in deposits:
-        if d.get('status') == 'approved':
-            settings = db.settings.find_one() or {'interest_rate': 25.0}
-            rate = settings.get('interest_rate', 25.0)  # Default to 25% daily if not set
-            principal = d.get('amount', 0)
-            start = d.get('submitted_at')
-            if start:
-                elapsed = (now - start).days
-                # Daily interest: principal * rate% * days
-                real_time_interest += (principal * rate / 100) * elapsed
-    # Only interest is withdrawable, principal is non-refundable
-    wallet_balance = real_time_interest - total_withdrawal
-    # Ensure wallet_balance is always defined for the template
-    return render_template(
-        'wallet.html',
-        wallet_balance=wallet_balance or 0,
-        real_time_interest=real_time_interest or 0,
-        total_deposit=total_deposit or 0,
-        total_withdrawal=total_withdrawal or 0
-    )
+    return render_template('wallet.html')
 
 # History page
-@app.route('/history')
 @login_required
 def history():
     if current_user.user_data.get('is_admin'):
         return redirect(url_for('admin.dashboard'))
-    deposits = list(db.deposits.find({'user_id': ObjectId(current_user.id)}))
-    withdrawals = list(db.withdrawals.find({'user_id': ObjectId(current_user.id)}))
-    history = []
-    for d in deposits:
-        h = dict(type='Deposit', amount=d['amount'], status=d.get('status'), date=d.get('submitted_at'), note=d.get('note', ''), id=str(d.get('_id')))
-        history.append(h)
-    for w in withdrawals:
-        h = dict(type='Withdrawal', amount=w['amount'], status=w.get('status'), date=w.get('requested_at'), note=w.get('note', ''), id=str(w.get('_id')))
-        history.append(h)
-    history.sort(key=lambda x: x['date'], reverse=True)
-    return render_template('history.html', history=history)
-
-# Register blueprints
-from routes.transactions import bp as transactions_bp
-from routes.admin import bp as admin_bp
-app.register_blueprint(transactions_bp)
-app.register_blueprint(admin_bp)
-
+    return render_template('history.html')
 
 # Article detail route to resolve BuildError
-@app.route('/article/<int:article_id>')
 def article(article_id):
     # You can fetch article data from a database or static list here
     # For now, just pass the id to the template
     return render_template('article.html', article_id=article_id)
 
+
+# Module-level app for `gunicorn app:app` and `python app.py`
+app = create_app()
+
 # Main entry point
 if __name__ == '__main__':
     app.run(debug=True)
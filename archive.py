@@ -0,0 +1,162 @@
+"""
+Time-bucketed archival of settled transactions.
+Moves settled rows older than ARCHIVE_AFTER_DAYS out of ``deposits``/``withdrawals``
+into monthly collections (``deposits_archive_YYYYMM``) and keeps a per-user rollup in
+``ledger_rollups`` so balances and history stay complete. Approved deposits are never
+archived: they keep accruing interest.
+
+Run periodically:  python archive.py [--days N]
+"""
+import argparse
+import os
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
+from extensions import db
+
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 180))
+BATCH_SIZE = 1000
+
+# kind -> (date field, settled statuses)
+KINDS = {
+    'deposits': ('submitted_at', ('rejected',)),
+    'withdrawals': ('requested_at', ('approved', 'rejected')),
+}
+
+
+def archive_name(kind, when):
+    return f'{kind}_archive_{when:%Y%m}'
+
+
+def archive_collections(kind):
+    """Archive collection names for ``kind``, newest month first."""
+    prefix = f'{kind}_archive_'
+    return sorted((n for n in db.list_collection_names() if n.startswith(prefix)), reverse=True)
+
+
+def get_rollup(user_id):
+    return db.ledger_rollups.find_one({'_id': user_id})
+
+
+def find_with_archive(kind, query=None, projection=None):
+    """Yield rows matching ``query`` from the hot collection, then from each monthly archive."""
+    query = query or {}
+    yield from db[kind].find(query, projection)
+    for name in archive_collections(kind):
+        yield from db[name].find(query, projection)
+
+
+def drop_archived(kind, rows, rollup):
+    """
+    Drop hot rows that ``rollup`` already counts. run_archival copies rows to the
+    archive and refreshes the rollup before deleting them, so in between a row is
+    in both places. Read the hot rows before the rollup for this to hold.
+    """
+    date_field, settled = KINDS[kind]
+    candidates = [
+        r['_id'] for r in rows
+        if r.get('status') in settled and r.get(date_field) and r[date_field] < rollup['archived_before']
+    ]
+    if not candidates:
+        return rows
+    archived = set()
+    for month in rollup.get('months', {}).get(kind, []):
+        # Copies made after the rollup was computed are not in its totals yet
+        cursor = db[f'{kind}_archive_{month}'].find(
+            {'_id': {'$in': candidates}, 'archived_at': {'$lte': rollup['updated_at']}}, {'_id': 1}
+        )
+        archived.update(doc['_id'] for doc in cursor)
+    return [r for r in rows if r['_id'] not in archived]
+
+
+def user_archive(kind, user_id, limit):
+    """Newest ``limit`` archived rows of one user, reading only as many months as needed."""
+    date_field = KINDS[kind][0]
+    rollup = get_rollup(user_id) or {}
+    rows = []
+    for month in sorted(rollup.get('months', {}).get(kind, []), reverse=True):
+        name = f'{kind}_archive_{month}'
+        rows.extend(db[name].find({'user_id': user_id}).sort(date_field, DESCENDING).limit(limit - len(rows)))
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+def _insert_archive(name, date_field, docs, now):
+    for doc in docs:
+        doc['archived_at'] = now
+    collection = db[name]
+    collection.create_index([('user_id', ASCENDING), (date_field, DESCENDING)])
+    # Incremental exports filter on updated_at, which is unrelated to the archive month
+    collection.create_index('updated_at')
+    try:
+        collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        # Rows already copied by an interrupted earlier run; anything else is a real error
+        if any(err.get('code') != 11000 for err in e.details.get('writeErrors', [])):
+            raise
+
+
+def _refresh_rollup(user_id, cutoff):
+    """Recompute a user's rollup from the archives, so re-running after a crash cannot double count."""
+    months, counts, withdrawn = {}, {}, 0
+    for kind in KINDS:
+        prefix = f'{kind}_archive_'
+        months[kind] = []
+        counts[kind] = 0
+        for name in archive_collections(kind):
+            n = db[name].count_documents({'user_id': user_id})
+            if n:
+                months[kind].append(name[len(prefix):])
+                counts[kind] += n
+    for name in archive_collections('withdrawals'):
+        total = next(db[name].aggregate([
+            {'$match': {'user_id': user_id, 'status': 'approved'}},
+            {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}
+        ]), {}).get('total', 0)
+        withdrawn += total
+    db.ledger_rollups.update_one(
+        {'_id': user_id},
+        {
+            '$set': {'months': months, 'counts': counts, 'withdrawn': withdrawn, 'updated_at': datetime.utcnow()},
+            '$max': {'archived_before': cutoff}
+        },
+        upsert=True
+    )
+
+
+def run_archival(days=ARCHIVE_AFTER_DAYS, now=None):
+    """Archive settled rows older than ``days``; returns the number of rows moved per kind."""
+    from ledger import bump_ledger_version
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=days)
+    moved = {}
+    for kind, (date_field, settled) in KINDS.items():
+        moved[kind] = 0
+        query = {'status': {'$in': list(settled)}, date_field: {'$lt': cutoff}}
+        while True:
+            docs = list(db[kind].find(query).limit(BATCH_SIZE))
+            if not docs:
+                break
+            by_month = {}
+            for doc in docs:
+                by_month.setdefault(archive_name(kind, doc[date_field]), []).append(doc)
+            for name, month_docs in by_month.items():
+                _insert_archive(name, date_field, month_docs, datetime.utcnow())
+            # Rollups before deleting; until the delete, readers drop the copied hot rows via
+            # drop_archived, and a crash in between is repaired by re-running
+            user_ids = {doc['user_id'] for doc in docs}
+            for user_id in user_ids:
+                _refresh_rollup(user_id, cutoff)
+            db[kind].delete_many({'_id': {'$in': [doc['_id'] for doc in docs]}})
+            for user_id in user_ids:
+                bump_ledger_version(user_id)
+            moved[kind] += len(docs)
+    return moved
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Archive settled deposits and withdrawals.')
+    parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS, help='archive settled rows older than this')
+    args = parser.parse_args()
+    print(run_archival(args.days))
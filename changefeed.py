@@ -0,0 +1,100 @@
+"""
+Change feed for the admin deposit/withdrawal queues.
+Yields batches of changed document ids for a collection. Uses MongoDB change
+streams where the deployment supports them (replica sets, Atlas) and falls back
+to polling the indexed ``updated_at`` field, which every deposit/withdrawal write
+sets, for a standalone mongod.
+"""
+import calendar
+import threading
+import time
+from datetime import datetime
+from pymongo.errors import OperationFailure
+from extensions import thread_share
+
+POLL_INTERVAL = 2  # seconds between polls / max await on the change stream
+STREAM_MAX_SECONDS = 300  # clients reconnect with Last-Event-ID after this
+MAX_BATCH = 500  # most ids pushed to the client in one tick
+# Each open stream holds a worker thread for up to STREAM_MAX_SECONDS
+MAX_STREAMS = thread_share('MAX_LIVE_STREAMS')
+
+# None until the first watch() attempt tells us whether change streams work
+_change_streams_supported = None
+_indexed = set()
+stream_slots = threading.BoundedSemaphore(MAX_STREAMS)
+
+
+def checkpoint_token(checkpoint):
+    """Serialise a naive UTC checkpoint as whole epoch seconds (SSE event id)."""
+    return str(calendar.timegm(checkpoint.utctimetuple()))
+
+
+def parse_checkpoint(token):
+    """Inverse of checkpoint_token; returns None for missing or bad tokens."""
+    try:
+        return datetime.utcfromtimestamp(int(float(token)))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _poll(collection, since):
+    # The bound is inclusive, so a row can be reported twice; callers upsert.
+    if collection.name not in _indexed:
+        collection.create_index('updated_at')
+        _indexed.add(collection.name)
+    cursor = collection.find({'updated_at': {'$gte': since}}, {'_id': 1})
+    return [doc['_id'] for doc in cursor]
+
+
+def _open_stream(collection):
+    global _change_streams_supported
+    if _change_streams_supported is False:
+        return None
+    pipeline = [{'$match': {'operationType': {'$in': ['insert', 'update', 'replace', 'delete']}}}]
+    try:
+        stream = collection.watch(pipeline, max_await_time_ms=POLL_INTERVAL * 1000)
+    except OperationFailure:
+        # Standalone mongod: "$changeStream is only supported on replica sets"
+        _change_streams_supported = False
+        return None
+    _change_streams_supported = True
+    return stream
+
+
+def _drain(stream, until):
+    # Stop at MAX_BATCH ids or at ``until`` even if changes keep arriving; the rest
+    # stay in the stream for the next tick, so the client hears from us regularly.
+    ids = {}
+    while len(ids) < MAX_BATCH and time.monotonic() < until:
+        change = stream.try_next()
+        if change is None:
+            break
+        ids.setdefault(change['documentKey']['_id'], None)
+    return list(ids)
+
+
+def iter_changes(collection, since, max_seconds=STREAM_MAX_SECONDS):
+    """
+    Yield ``(ids, checkpoint)`` for changes to ``collection`` after ``since``.
+    ``ids`` may be empty (a heartbeat tick); ``checkpoint`` is the time a client
+    can resume from once it has applied the batch.
+    """
+    deadline = time.monotonic() + max_seconds
+    # Open the stream before the catch-up poll so nothing slips in between.
+    stream = _open_stream(collection)
+    try:
+        checkpoint = datetime.utcnow()
+        yield _poll(collection, since), checkpoint
+        while time.monotonic() < deadline:
+            if stream is not None:
+                next_checkpoint = datetime.utcnow()
+                ids = _drain(stream, min(time.monotonic() + POLL_INTERVAL, deadline))
+            else:
+                time.sleep(POLL_INTERVAL)
+                next_checkpoint = datetime.utcnow()
+                ids = _poll(collection, checkpoint)
+            checkpoint = next_checkpoint
+            yield ids, checkpoint
+    finally:
+        if stream is not None:
+            stream.close()
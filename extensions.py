@@ -1,4 +1,5 @@
 import os
+import threading
 import pymongo
 from pymongo import MongoClient
 from dotenv import load_dotenv
@@ -7,10 +8,77 @@ from flask_login import UserMixin
 # Load environment variables
 load_dotenv()
 
-# Initialize MongoDB
-mongo_uri = os.getenv('MONGODB_URI') or os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
-client = MongoClient(mongo_uri)
-db = client[os.getenv('DB_NAME', 'investment_db')]
+# gunicorn threads per worker (render.yaml passes the same value to --threads)
+WORKER_THREADS = int(os.getenv('GUNICORN_THREADS', 8))
+
+
+def thread_share(env_name):
+    """
+    Per-worker slot count for work that can hold a thread for long (password hashing,
+    live streams): ``env_name`` if set, else a quarter of the threads, so ordinary
+    requests always find a free thread.
+    """
+    return int(os.getenv(env_name, max(1, WORKER_THREADS // 4)))
+
+
+class LazyDatabase:
+    """
+    Stand-in for the MongoDB database object. The client is only created (and the
+    connection checked) on first use, so importing modules and forking workers
+    does not touch the network.
+    """
+
+    def __init__(self):
+        self._db = None
+        self._lock = threading.Lock()
+        self.configure(
+            os.getenv('MONGODB_URI') or os.getenv('MONGO_URI', 'mongodb://localhost:27017/'),
+            os.getenv('DB_NAME', 'investment_db')
+        )
+
+    def configure(self, uri, name):
+        """Point at another server/database; an open connection is dropped, not reused."""
+        with self._lock:
+            if self._db is not None and (uri, name) != (self._uri, self._name):
+                self._db.client.close()
+                self._db = None
+            self._uri = uri
+            self._name = name
+
+    def _connect(self):
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    client = MongoClient(self._uri)
+                    database = client[self._name]
+                    check_connection(database)
+                    self._db = database
+        return self._db
+
+    def __getattr__(self, name):
+        return getattr(self._connect(), name)
+
+    def __getitem__(self, name):
+        return self._connect()[name]
+
+
+def check_connection(database):
+    # Handle MongoDB authentication error
+    try:
+        # Attempt to fetch a document to trigger authentication
+        database.collection_name.find_one()
+    except pymongo.errors.OperationFailure as e:
+        if 'authentication failed' in str(e):
+            print("MongoDB authentication failed. Please check your credentials.")
+        else:
+            print(f"An error occurred: {e}")
+        # Additional handling for bad auth error
+        if 'bad auth' in str(e):
+            print("MongoDB authentication failed: bad auth. Please check your username and password.")
+
+
+# Initialize MongoDB (connects on first use)
+db = LazyDatabase()
 
 def calculate_simple_interest(principal, rate, time):
     return (principal * rate * time) / 100
@@ -19,16 +87,3 @@ class User(UserMixin):
     def __init__(self, user_data):
         self.user_data = user_data
         self.id = str(user_data['_id'])
-
-# Handle MongoDB authentication error
-try:
-    # Attempt to fetch a document to trigger authentication
-    db.collection_name.find_one()
-except pymongo.errors.OperationFailure as e:
-    if 'authentication failed' in str(e):
-        print("MongoDB authentication failed. Please check your credentials.")
-    else:
-        print(f"An error occurred: {e}")
-    # Additional handling for bad auth error
-    if 'bad auth' in str(e):
-        print("MongoDB authentication failed: bad auth. Please check your username and password.")
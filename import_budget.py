@@ -0,0 +1,84 @@
+"""
+Worker boot budget for `import app`.
+Imports the app in a fresh interpreter with ``-X importtime``, reports the slowest
+modules and the peak RSS, and fails if they exceed import_budget.json or if a
+module on its deny list (heavy libraries that only some routes need) was loaded.
+
+    python import_budget.py            # check against the budget
+    python import_budget.py --update   # re-record the report section
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'import_budget.json')
+PROBE = (
+    'import resource, sys, app; '
+    'print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss); '
+    'print(" ".join(sorted(sys.modules)))'
+)
+
+
+def measure():
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE],
+        cwd=os.path.dirname(BUDGET_FILE), capture_output=True, text=True, check=True
+    )
+    # importtime lines: "import time: <self us> | <cumulative us> | <indent><module>"
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = max(modules.get(name.strip(), 0), int(cumulative))
+    rss_line, modules_line = result.stdout.strip().splitlines()[-2:]
+    rss_kb = int(rss_line)
+    if sys.platform == 'darwin':
+        rss_kb //= 1024  # macOS reports bytes
+    slowest = sorted(modules.items(), key=lambda kv: kv[1], reverse=True)[:15]
+    return {
+        'import_app_ms': round(modules.get('app', 0) / 1000, 1),
+        'peak_rss_mb': round(rss_kb / 1024, 1),
+        'slowest_ms': {name: round(us / 1000, 1) for name, us in slowest},
+        'loaded': modules_line.split(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--update', action='store_true', help='record the current measurement as the report')
+    args = parser.parse_args()
+
+    with open(BUDGET_FILE) as f:
+        budget = json.load(f)
+    result = measure()
+    loaded = set(result.pop('loaded'))
+
+    print(f"import app: {result['import_app_ms']} ms (budget {budget['budget']['import_app_ms']} ms)")
+    print(f"peak RSS:   {result['peak_rss_mb']} MB (budget {budget['budget']['peak_rss_mb']} MB)")
+    for name, ms in result['slowest_ms'].items():
+        print(f'  {ms:8.1f} ms  {name}')
+
+    if args.update:
+        result['python'] = platform.python_version()
+        budget['report'] = result
+        with open(BUDGET_FILE, 'w') as f:
+            json.dump(budget, f, indent=2)
+            f.write('\n')
+        print(f'Updated report in {BUDGET_FILE}')
+
+    problems = [f'{m} imported at boot' for m in budget['deny'] if m in loaded]
+    if result['import_app_ms'] > budget['budget']['import_app_ms']:
+        problems.append('import time over budget')
+    if result['peak_rss_mb'] > budget['budget']['peak_rss_mb']:
+        problems.append('peak RSS over budget')
+    for problem in problems:
+        print(f'FAIL: {problem}')
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
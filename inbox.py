@@ -0,0 +1,95 @@
+"""
+Buffered ingestion for contact-form submissions.
+Submissions are queued in memory and written with insert_many once the buffer
+reaches FLUSH_SIZE or FLUSH_SECONDS after the first queued message, and on
+process exit. Duplicate (email, message) pairs are dropped via a unique hash.
+A failed write keeps the batch queued and retries it FLUSH_SECONDS later.
+"""
+import atexit
+import hashlib
+import os
+import threading
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError, PyMongoError
+from extensions import db
+
+FLUSH_SIZE = 50
+FLUSH_SECONDS = 2.0
+# Messages are removed by a TTL index this many days after submission, so spam
+# bursts cannot grow the collection without bound
+CONTACTS_RETENTION_DAYS = int(os.getenv('CONTACTS_RETENTION_DAYS', 365))
+
+_buffer = []
+_lock = threading.Lock()
+_timer = None
+_indexes_ready = False
+
+
+def dedupe_key(email, message):
+    return hashlib.sha256(f'{email.strip().lower()}\n{message.strip()}'.encode('utf-8')).hexdigest()
+
+
+def ensure_indexes():
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    # Partial: messages stored before dedupe_key existed do not have one
+    db.contacts.create_index('dedupe_key', unique=True, partialFilterExpression={'dedupe_key': {'$exists': True}})
+    # Bounded by age rather than capped: a capped collection rejects updates that grow
+    # a document, such as marking a message stored without a 'read' field as read.
+    # The TTL index also serves the newest-first inbox sort.
+    db.contacts.create_index([('submitted_at', ASCENDING)], expireAfterSeconds=CONTACTS_RETENTION_DAYS * 86400)
+    db.contacts.create_index([('read', 1), ('submitted_at', DESCENDING)])
+    _indexes_ready = True
+
+
+def _schedule_flush():
+    # Caller holds _lock
+    global _timer
+    if _timer is None:
+        _timer = threading.Timer(FLUSH_SECONDS, flush)
+        _timer.daemon = True
+        _timer.start()
+
+
+def submit(contact):
+    """Queue a contact document; it is written on the next flush."""
+    contact['dedupe_key'] = dedupe_key(contact['email'], contact['message'])
+    contact.setdefault('read', False)
+    with _lock:
+        if any(c['dedupe_key'] == contact['dedupe_key'] for c in _buffer):
+            return
+        _buffer.append(contact)
+        flush_now = len(_buffer) >= FLUSH_SIZE
+        if not flush_now:
+            _schedule_flush()
+    if flush_now:
+        flush()
+
+
+def flush():
+    """Write all queued contacts; duplicates of stored messages are skipped."""
+    global _timer
+    with _lock:
+        batch = _buffer[:]
+        del _buffer[:]
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+    if not batch:
+        return
+    try:
+        ensure_indexes()
+        db.contacts.insert_many(batch, ordered=False)
+    except PyMongoError as e:
+        if isinstance(e, BulkWriteError) and all(err.get('code') == 11000 for err in e.details.get('writeErrors', [])):
+            return
+        # Runs in a request or timer thread: keep the messages and retry later instead of raising.
+        # Rows that did get written are skipped as duplicates on the retry.
+        print(f'Saving {len(batch)} contact messages failed, retrying in {FLUSH_SECONDS}s: {e}')
+        with _lock:
+            _buffer[:0] = batch
+            _schedule_flush()
+
+
+atexit.register(flush)
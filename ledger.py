@@ -0,0 +1,114 @@
+"""
+Per-user ledger computations shared by the page routes and the JSON API.
+Each user document carries a ``ledger_version`` counter, bumped on every write to
+their deposits or withdrawals, so callers can tell whether a ledger has changed
+without loading it. Settled rows moved out by archive.py are read back through
+their rollup (for totals) or the monthly archives (for history paging).
+"""
+from datetime import timedelta
+from bson import ObjectId
+from extensions import db
+from archive import get_rollup, user_archive, drop_archived
+from render_cache import cache as render_cache
+
+
+def bump_ledger_version(user_id):
+    db.users.update_one({'_id': ObjectId(user_id)}, {'$inc': {'ledger_version': 1}})
+    render_cache.invalidate_user(user_id)
+
+
+def load_ledger(user_id):
+    user_id = ObjectId(user_id)
+    deposits = list(db.deposits.find({'user_id': user_id}))
+    withdrawals = list(db.withdrawals.find({'user_id': user_id}))
+    rollup = get_rollup(user_id)
+    if rollup:
+        deposits = drop_archived('deposits', deposits, rollup)
+        withdrawals = drop_archived('withdrawals', withdrawals, rollup)
+    if rollup and rollup.get('withdrawn'):
+        # Archived approved withdrawals still count against the balance; history skips this row
+        withdrawals.append({'amount': rollup['withdrawn'], 'status': 'approved', 'rollup': True})
+    return deposits, withdrawals
+
+
+def current_settings():
+    return db.settings.find_one() or {}
+
+
+def approved_total(rows, statuses=('approved',)):
+    return sum(r['amount'] for r in rows if r.get('status') in statuses)
+
+
+def interest_annual(deposits, rate, now):
+    """Dashboard rule: annual simple interest by whole days, capped at the deposit duration."""
+    interest = 0
+    for d in deposits:
+        if d.get('status') == 'approved':
+            principal = d.get('amount', 0)
+            start = d.get('submitted_at')
+            days = d.get('duration_days', 0)
+            if start:
+                elapsed = min((now - start).days, days)
+                interest += (principal * rate * (elapsed / 365)) / 100
+    return interest
+
+
+def interest_daily(deposits, rate, now):
+    """Wallet rule: ``rate`` percent of principal per whole day since the deposit."""
+    interest = 0
+    for d in deposits:
+        if d.get('status') == 'approved':
+            principal = d.get('amount', 0)
+            start = d.get('submitted_at')
+            if start:
+                elapsed = (now - start).days
+                interest += (principal * rate / 100) * elapsed
+    return interest
+
+
+def next_accrual(deposits, now):
+    """Earliest time an approved deposit completes another whole day, or None."""
+    boundaries = [
+        d['submitted_at'] + timedelta(days=(now - d['submitted_at']).days + 1)
+        for d in deposits
+        if d.get('status') == 'approved' and d.get('submitted_at')
+    ]
+    return min(boundaries) if boundaries else None
+
+
+def build_history(deposits, withdrawals):
+    # Transaction history: combine deposits and withdrawals, sort by date
+    history = []
+    for d in deposits:
+        h = dict(type='Deposit', amount=d['amount'], status=d.get('status'), date=d.get('submitted_at'), note=d.get('note', ''), id=str(d.get('_id')))
+        history.append(h)
+    for w in withdrawals:
+        if w.get('rollup'):
+            continue
+        h = dict(type='Withdrawal', amount=w['amount'], status=w.get('status'), date=w.get('requested_at'), note=w.get('note', ''), id=str(w.get('_id')))
+        history.append(h)
+    history.sort(key=lambda x: x['date'], reverse=True)
+    return history
+
+
+def load_history_page(user_id, page, page_size):
+    """
+    One page of history, newest first, reading the archives only when the page
+    reaches past the hot window. Returns ``(rows, has_more)``.
+    """
+    user_id = ObjectId(user_id)
+    deposits, withdrawals = load_ledger(user_id)
+    history = build_history(deposits, withdrawals)
+    total = len(history)
+    end = page * page_size
+    rollup = get_rollup(user_id)
+    if rollup and sum(rollup.get('counts', {}).values()):
+        total += sum(rollup['counts'].values())
+        # Archived rows are all older than archived_before, so hot rows newer than it come first
+        recent = sum(1 for h in history if h['date'] and h['date'] >= rollup['archived_before'])
+        if recent < end:
+            history = build_history(
+                deposits + user_archive('deposits', user_id, end),
+                withdrawals + user_archive('withdrawals', user_id, end)
+            )
+    return history[end - page_size:end], end < total
@@ -0,0 +1,29 @@
+"""
+Deposit maturity projections for the dashboard chart.
+Each approved deposit accrues simple annual interest by whole days, capped at its
+duration (same rule as the dashboard balance). A user's projection is computed in
+one pass as a (deposits x samples) array of accrued days and summed over deposits.
+"""
+from datetime import timedelta
+
+DEFAULT_RATE = 8.0
+MAX_HORIZON_DAYS = 3650
+STEPS = {'daily': 1, 'monthly': 30}
+
+
+def user_projection(deposits, rate, now, horizon_days=365, step='daily'):
+    """
+    Project accrued interest of ``deposits`` from ``now`` (naive UTC) over ``horizon_days``.
+    Returns ``(dates, interest)`` sampled every ``step``.
+    """
+    import numpy as np
+    offsets = np.arange(0, horizon_days + 1, STEPS[step])
+    deposits = [d for d in deposits if d.get('submitted_at')]
+    amount = np.array([float(d.get('amount', 0)) for d in deposits], dtype=np.float64)
+    elapsed = np.array([(now - d['submitted_at']).days for d in deposits], dtype=np.int64)
+    duration = np.array([max(int(d.get('duration_days', 0)), 0) for d in deposits], dtype=np.int64)
+    # Days accrued by each deposit at each sample: 0 before it starts, capped at maturity
+    days = np.clip(offsets[None, :] + elapsed[:, None], 0, duration[:, None])
+    total = (amount[:, None] * rate * days / 36500).sum(axis=0)
+    dates = [now.date() + timedelta(days=int(o)) for o in offsets]
+    return dates, total
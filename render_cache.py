@@ -0,0 +1,65 @@
+"""
+Per-user cache of rendered dashboard/wallet/history payloads.
+Entries are keyed by (view, user, ledger version, settings version, query) and
+expire at the next interest accrual, so a hit is always what a fresh render would
+produce. LRU eviction keeps the total size under RENDER_CACHE_MAX_BYTES.
+Correctness does not depend on invalidation (a ledger write changes the key);
+invalidate_user just frees the stale entries early.
+"""
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+RENDER_CACHE_MAX_BYTES = int(os.getenv('RENDER_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+
+
+class RenderCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (body, valid_until)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, now=None):
+        """Return ``(body, valid_until)`` for a live entry, else None."""
+        now = now or datetime.utcnow()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            body, valid_until = entry
+            if valid_until is not None and now >= valid_until:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, body, valid_until):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (body, valid_until)
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            for key in [k for k in self._entries if k[1] == user_id]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key):
+        body, _ = self._entries.pop(key)
+        self._size -= len(body)
+
+
+cache = RenderCache(RENDER_CACHE_MAX_BYTES)
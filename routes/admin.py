@@ -4,21 +4,27 @@ Handles admin login, dashboard, user management, deposits, withdrawals, settings
 Protects routes with admin_required.
 Uses Flask, Flask-Login, MongoDB (via extensions.py), and Pandas for reporting.
 """
-from flask import Blueprint, request, flash, redirect, url_for, render_template, send_file, current_app
+from flask import Blueprint, request, flash, redirect, url_for, render_template, send_file, current_app, Response, stream_with_context
 from flask_login import login_required, current_user, login_user
 from functools import wraps
 from bson import ObjectId
 from datetime import datetime
-from werkzeug.security import check_password_hash
 from extensions import db, User
+from security import allow_attempt, hash_password, verify_password, needs_rehash, HashBusy
+from changefeed import iter_changes, checkpoint_token, parse_checkpoint, stream_slots
+from exports import export_parquet, parquet_available
+from archive import find_with_archive, archive_collections, KINDS, ARCHIVE_AFTER_DAYS
+import inbox
+from render_cache import cache as render_cache
+from ledger import bump_ledger_version, load_ledger, current_settings, approved_total, interest_annual
+import json
 import os
-try:
-    import pandas as pd
-except ImportError:
-    pd = None
+import tempfile
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+CONTACTS_PAGE_SIZE = 50
+
 def admin_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -31,8 +37,24 @@ def admin_required(f):
 @bp.route('/login', methods=['GET', 'POST'])
 def admin_login():
     if request.method == 'POST':
+        # Throttle before any DB lookup or hashing
+        if not allow_attempt('admin_login', request.remote_addr, request.form['email']):
+            flash('Too many login attempts. Please try again later.')
+            return render_template('login.html'), 429
         user_data = db.users.find_one({'email': request.form['email'], 'is_admin': True})
-        if user_data and check_password_hash(user_data['password'], request.form['password']):
+        try:
+            valid = user_data and verify_password(user_data['password'], request.form['password'])
+        except HashBusy:
+            flash('Server is busy. Please try again in a moment.')
+            return render_template('login.html'), 503
+        if valid and needs_rehash(user_data['password']):
+            try:
+                new_hash = hash_password(request.form['password'])
+            except HashBusy:
+                pass  # Upgrade on a later login; a correct password is never refused for it
+            else:
+                db.users.update_one({'_id': user_data['_id']}, {'$set': {'password': new_hash}})
+        if valid:
             user = User(user_data)
             login_user(user)
             flash('Admin login successful!')
@@ -95,20 +117,17 @@ def users():
     users_list = list(db.users.find(query))
     return render_template('admin/users.html', users=users_list, search=search)
 
-@bp.route('/deposits')
-@login_required
-@admin_required
-def deposits():
-    status = request.args.get('status', '')
-    start_date = request.args.get('start_date', '')
-    end_date = request.args.get('end_date', '')
-    user_search = request.args.get('user', '')
-    
+def _queue_query(args, date_field):
+    status = args.get('status', '')
+    start_date = args.get('start_date', '')
+    end_date = args.get('end_date', '')
+    user_search = args.get('user', '')
+
     query = {}
     if status:
         query['status'] = status
     if start_date and end_date:
-        query['submitted_at'] = {
+        query[date_field] = {
             '$gte': datetime.strptime(start_date, '%Y-%m-%d'),
             '$lte': datetime.strptime(end_date, '%Y-%m-%d')
         }
@@ -121,14 +140,99 @@ def deposits():
         })
         if user:
             query['user_id'] = user['_id']
-    
-    deposits = list(db.deposits.find(query).sort('submitted_at', -1))
-    # Attach user info for display (fixes 'Unknown' user)
-    users = {str(u['_id']): u for u in db.users.find()}
-    for d in deposits:
-        user = users.get(str(d.get('user_id')))
-        d['user_data'] = user if user else {'full_name': 'Unknown'}
-    return render_template('admin/deposits.html', deposits=deposits)
+    return query
+
+def _attach_users(rows):
+    # Attach user info for display (fixes 'Unknown' user); only fetch the users on the page
+    user_ids = list({r.get('user_id') for r in rows if r.get('user_id')})
+    users = {u['_id']: u for u in db.users.find({'_id': {'$in': user_ids}})} if user_ids else {}
+    for r in rows:
+        r['user_data'] = users.get(r.get('user_id')) or {'full_name': 'Unknown'}
+    return rows
+
+def _queue_rows(kind, args, date_field):
+    """
+    Rows for an admin queue view, newest first, plus whether settled rows may be
+    missing. Archived rows are read back when the filter is narrowed to a user or a
+    date range; an unfiltered view only shows the hot collection.
+    """
+    query = _queue_query(args, date_field)
+    rows = list(db[kind].find(query).sort(date_field, -1))
+    status = args.get('status', '')
+    prefix = f'{kind}_archive_'
+    # Pending rows (and approved deposits) are never archived
+    months = archive_collections(kind) if status in ('',) + KINDS[kind][1] else []
+    if not months:
+        return rows, False
+    if 'user_id' not in query and date_field not in query:
+        return rows, True
+    dates = query.get(date_field, {})
+    seen = {r['_id'] for r in rows}
+    for name in months:
+        # Archives are bucketed by the same date the view filters on
+        month = name[len(prefix):]
+        if '$gte' in dates and month < f"{dates['$gte']:%Y%m}" or '$lte' in dates and month > f"{dates['$lte']:%Y%m}":
+            continue
+        # A row is briefly in both places while archive.py runs
+        rows.extend(r for r in db[name].find(query) if r['_id'] not in seen)
+    rows.sort(key=lambda r: r[date_field], reverse=True)
+    return rows, False
+
+def _queue_stream(collection, query, row_template, row_name):
+    """Server-Sent Events feed of rows added to or changed in an admin queue."""
+    since = parse_checkpoint(request.headers.get('Last-Event-ID') or request.args.get('since'))
+    if since is None:
+        since = datetime.utcnow()
+
+    def event(name, payload, checkpoint):
+        return f"event: {name}\nid: {checkpoint_token(checkpoint)}\ndata: {json.dumps(payload)}\n\n"
+
+    def generate():
+        yield 'retry: 5000\n\n'
+        for ids, checkpoint in iter_changes(collection, since):
+            if not ids:
+                yield ': keepalive\n\n'
+                continue
+            rows = _attach_users(list(collection.find({'$and': [query, {'_id': {'$in': ids}}]})))
+            rows = {r['_id']: r for r in rows}
+            for _id in ids:
+                row = rows.get(_id)
+                if row is None:
+                    # Changed out of this view's filter (e.g. approved while viewing pending)
+                    yield event('remove', {'id': str(_id)}, checkpoint)
+                else:
+                    html = render_template(row_template, **{row_name: row})
+                    yield event('row', {'id': str(_id), 'html': html}, checkpoint)
+
+    # 204 tells EventSource to stop reconnecting; the page still works with manual reloads
+    if not stream_slots.acquire(blocking=False):
+        return '', 204
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+    response.call_on_close(stream_slots.release)
+    return response
+
+def _stream_url(endpoint):
+    # Same filters as the page; the stream resumes from the time the page was rendered
+    args = dict(request.args.items(), since=checkpoint_token(datetime.utcnow()))
+    return url_for(endpoint, **args)
+
+@bp.route('/deposits')
+@login_required
+@admin_required
+def deposits():
+    stream_url = _stream_url('admin.deposits_stream')
+    deposits, archive_hidden = _queue_rows('deposits', request.args, 'submitted_at')
+    deposits = _attach_users(deposits)
+    return render_template('admin/deposits.html', deposits=deposits, stream_url=stream_url,
+                           archive_hidden=archive_hidden, archive_days=ARCHIVE_AFTER_DAYS)
+
+@bp.route('/deposits/stream')
+@login_required
+@admin_required
+def deposits_stream():
+    query = _queue_query(request.args, 'submitted_at')
+    return _queue_stream(db.deposits, query, 'admin/_deposit_row.html', 'deposit')
 
 @bp.route('/deposits/<deposit_id>/<action>')
 @login_required
@@ -138,15 +242,20 @@ def handle_deposit(deposit_id, action):
         flash('Invalid action')
         return redirect(url_for('admin.deposits'))
     
-    db.deposits.update_one(
+    now = datetime.utcnow()
+    deposit = db.deposits.find_one_and_update(
         {'_id': ObjectId(deposit_id)},
         {
             '$set': {
                 'status': 'approved' if action == 'approve' else 'rejected',
-                'approved_at': datetime.utcnow()
+                'approved_at': now,
+                'updated_at': now
             }
-        }
+        },
+        projection={'user_id': 1}
     )
+    if deposit:
+        bump_ledger_version(deposit['user_id'])
     
     flash(f'Deposit {action}d successfully')
     return redirect(url_for('admin.deposits'))
@@ -155,36 +264,18 @@ def handle_deposit(deposit_id, action):
 @login_required
 @admin_required
 def withdrawals():
-    status = request.args.get('status', '')
-    start_date = request.args.get('start_date', '')
-    end_date = request.args.get('end_date', '')
-    user_search = request.args.get('user', '')
-    
-    query = {}
-    if status:
-        query['status'] = status
-    if start_date and end_date:
-        query['requested_at'] = {
-            '$gte': datetime.strptime(start_date, '%Y-%m-%d'),
-            '$lte': datetime.strptime(end_date, '%Y-%m-%d')
-        }
-    if user_search:
-        user = db.users.find_one({
-            '$or': [
-                {'email': {'$regex': user_search, '$options': 'i'}},
-                {'full_name': {'$regex': user_search, '$options': 'i'}}
-            ]
-        })
-        if user:
-            query['user_id'] = user['_id']
-    
-    withdrawals = list(db.withdrawals.find(query).sort('requested_at', -1))
-    # Attach user info for display
-    users = {str(u['_id']): u for u in db.users.find()}
-    for w in withdrawals:
-        user = users.get(str(w.get('user_id')))
-        w['user_data'] = user if user else {'full_name': 'Unknown'}
-    return render_template('admin/withdrawals.html', withdrawals=withdrawals)
+    stream_url = _stream_url('admin.withdrawals_stream')
+    withdrawals, archive_hidden = _queue_rows('withdrawals', request.args, 'requested_at')
+    withdrawals = _attach_users(withdrawals)
+    return render_template('admin/withdrawals.html', withdrawals=withdrawals, stream_url=stream_url,
+                           archive_hidden=archive_hidden, archive_days=ARCHIVE_AFTER_DAYS)
+
+@bp.route('/withdrawals/stream')
+@login_required
+@admin_required
+def withdrawals_stream():
+    query = _queue_query(request.args, 'requested_at')
+    return _queue_stream(db.withdrawals, query, 'admin/_withdrawal_row.html', 'withdrawal')
 
 @bp.route('/withdrawals/<withdrawal_id>/<action>')
 @login_required
@@ -194,15 +285,20 @@ def handle_withdrawal(withdrawal_id, action):
         flash('Invalid action')
         return redirect(url_for('admin.withdrawals'))
     
-    db.withdrawals.update_one(
+    now = datetime.utcnow()
+    withdrawal = db.withdrawals.find_one_and_update(
         {'_id': ObjectId(withdrawal_id)},
         {
             '$set': {
                 'status': 'approved' if action == 'approve' else 'rejected',
-                'approved_at': datetime.utcnow()
+                'approved_at': now,
+                'updated_at': now
             }
-        }
+        },
+        projection={'user_id': 1}
     )
+    if withdrawal:
+        bump_ledger_version(withdrawal['user_id'])
     
     flash(f'Withdrawal {action}d successfully')
     return redirect(url_for('admin.withdrawals'))
@@ -223,6 +319,7 @@ def settings():
             },
             upsert=True
         )
+        render_cache.clear()
         flash('Interest rate updated successfully')
         return redirect(url_for('admin.settings'))
     
@@ -233,16 +330,22 @@ def settings():
 @login_required
 @admin_required
 def reports():
-    if pd is None:
+    report_type = request.args.get('type', '')
+    if request.args.get('format') == 'parquet':
+        return _parquet_report(report_type)
+
+    # pandas (and numpy) are only needed here; keep them out of worker boot
+    try:
+        import pandas as pd
+    except ImportError:
         flash('Pandas is not installed. Reports are not available.')
         return redirect(url_for('admin.dashboard'))
     
-    report_type = request.args.get('type', '')
     if report_type == 'users':
         df = pd.DataFrame(list(db.users.find({'is_admin': False})))
         filename = 'users_report.csv'
     elif report_type == 'deposits':
-        deposits = list(db.deposits.find())
+        deposits = list(find_with_archive('deposits'))
         users = {str(u['_id']): u for u in db.users.find()}
         for d in deposits:
             user = users.get(str(d.get('user_id')))
@@ -252,7 +355,7 @@ def reports():
         df = pd.DataFrame(deposits)
         filename = 'deposits_report.csv'
     elif report_type == 'withdrawals':
-        withdrawals = list(db.withdrawals.find())
+        withdrawals = list(find_with_archive('withdrawals'))
         users = {str(u['_id']): u for u in db.users.find()}
         for w in withdrawals:
             user = users.get(str(w.get('user_id')))
@@ -276,6 +379,38 @@ def reports():
     
     return send_file(filepath, as_attachment=True, mimetype='text/csv')
 
+def _parquet_report(report_type):
+    if not parquet_available():
+        flash('PyArrow is not installed. Parquet reports are not available.')
+        return redirect(url_for('admin.dashboard'))
+    if report_type not in ('users', 'deposits', 'withdrawals'):
+        flash('Invalid report type')
+        return redirect(url_for('admin.dashboard'))
+
+    # Incremental export: ?since=<watermark from the previous export's X-Export-Watermark>
+    since = request.args.get('since', '').strip()
+    if since:
+        try:
+            since = datetime.fromisoformat(since)
+        except ValueError:
+            flash('Invalid watermark; expected an ISO date/time.')
+            return redirect(url_for('admin.dashboard'))
+        filename = f"{report_type}_report_since_{since.strftime('%Y%m%dT%H%M%S')}.parquet"
+    else:
+        since = None
+        filename = f'{report_type}_report.parquet'
+
+    # Reports hold emails and bank details; never write them under the public upload folder
+    tmp = tempfile.TemporaryFile()
+    count, watermark = export_parquet(db, report_type, tmp, since)
+    tmp.seek(0)
+
+    response = send_file(tmp, as_attachment=True, download_name=filename, mimetype='application/vnd.apache.parquet')
+    response.headers['X-Export-Rows'] = str(count)
+    if watermark is not None:
+        response.headers['X-Export-Watermark'] = watermark.isoformat()
+    return response
+
 @bp.route('/add-admin', methods=['GET', 'POST'])
 @login_required
 @admin_required
@@ -315,12 +450,16 @@ def add_admin():
             flash('Invalid phone number.')
             return redirect(url_for('admin.add_admin'))
 
-        from werkzeug.security import generate_password_hash
+        try:
+            password_hash = hash_password(password)
+        except HashBusy:
+            flash('Server is busy. Please try again in a moment.')
+            return render_template('admin/add_admin.html'), 503
         user = {
             'full_name': full_name,
             'email': email,
             'phone': phone,
-            'password': generate_password_hash(password),
+            'password': password_hash,
             'is_admin': True,
             'created_at': datetime.utcnow()
         }
@@ -333,8 +472,28 @@ def add_admin():
 @login_required
 @admin_required
 def contacts():
-    contacts = list(db.contacts.find().sort('submitted_at', -1))
-    return render_template('admin/contacts.html', contacts=contacts)
+    inbox.ensure_indexes()
+    show = request.args.get('show', 'all')
+    page = max(request.args.get('page', 1, type=int), 1)
+    # Messages stored before read tracking have no 'read' field and count as unread
+    query = {'read': {'$ne': True}} if show == 'unread' else {}
+    # Fetch one extra row to know whether there is a next page without counting everything
+    contacts = list(db.contacts.find(query).sort('submitted_at', -1)
+                    .skip((page - 1) * CONTACTS_PAGE_SIZE).limit(CONTACTS_PAGE_SIZE + 1))
+    has_next = len(contacts) > CONTACTS_PAGE_SIZE
+    unread_count = db.contacts.count_documents({'read': {'$ne': True}})
+    return render_template('admin/contacts.html', contacts=contacts[:CONTACTS_PAGE_SIZE], show=show,
+                           page=page, has_next=has_next, unread_count=unread_count)
+
+@bp.route('/contacts/<contact_id>/<action>')
+@login_required
+@admin_required
+def handle_contact(contact_id, action):
+    if action not in ['read', 'unread']:
+        flash('Invalid action')
+        return redirect(url_for('admin.contacts'))
+    db.contacts.update_one({'_id': ObjectId(contact_id)}, {'$set': {'read': action == 'read'}})
+    return redirect(url_for('admin.contacts', show=request.args.get('show', 'all'), page=request.args.get('page', 1)))
 
 @bp.route('/user-wallets')
 @login_required
@@ -350,25 +509,13 @@ def user_wallets():
         ]
     users = list(db.users.find(user_query))
     user_wallets = []
-    from datetime import datetime as dt
-    now = dt.utcnow()
+    rate = current_settings().get('interest_rate', 8.0)
+    now = datetime.utcnow()
     for user in users:
-        deposits = list(db.deposits.find({'user_id': user['_id']}))
-        withdrawals = list(db.withdrawals.find({'user_id': user['_id']}))
-        total_deposit = sum(d['amount'] for d in deposits if d.get('status') == 'approved')
-        total_withdrawal = sum(w['amount'] for w in withdrawals if w.get('status') == 'approved')
-        real_time_interest = 0
-        for d in deposits:
-            if d.get('status') == 'approved':
-                settings = db.settings.find_one() or {'interest_rate': 8.0}
-                rate = settings.get('interest_rate', 8.0)
-                principal = d.get('amount', 0)
-                start = d.get('submitted_at')
-                days = d.get('duration_days', 0)
-                if start:
-                    elapsed = (now - start).days
-                    elapsed = min(elapsed, days)
-                    real_time_interest += (principal * rate * (elapsed/365)) / 100
+        deposits, withdrawals = load_ledger(user['_id'])
+        total_deposit = approved_total(deposits)
+        total_withdrawal = approved_total(withdrawals)
+        real_time_interest = interest_annual(deposits, rate, now)
         # Wallet balance should be only interest earned minus withdrawals
         wallet_balance = real_time_interest - total_withdrawal
         user_wallets.append({
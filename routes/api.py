@@ -0,0 +1,121 @@
+"""
+Versioned JSON API backing the user dashboard, wallet, withdraw and history pages.
+Responses carry an ETag built from the user's ledger version, the settings version
+and the next interest accrual time, so a matching If-None-Match is answered with
+304 before any ledger query or computation runs. Other repeat requests are served
+from the per-user render cache (render_cache.py) under the same key.
+"""
+import calendar
+import json
+import zlib
+from datetime import datetime
+from functools import wraps
+from flask import Blueprint, Response, request, jsonify
+from flask_login import login_required, current_user
+from ledger import (load_ledger, current_settings, approved_total, interest_annual,
+                    interest_daily, next_accrual, load_history_page)
+from render_cache import cache as render_cache
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+HISTORY_PAGE_SIZE = 50
+
+
+def _epoch(value):
+    return calendar.timegm(value.utctimetuple())
+
+
+def _cache_key(kind, settings):
+    settings_stamp = _epoch(settings['updated_at']) if settings.get('updated_at') else 0
+    ledger_version = current_user.user_data.get('ledger_version', 0)
+    # Query string (e.g. history page) is part of the representation
+    query = zlib.crc32(request.query_string)
+    return (kind, current_user.id, ledger_version, settings_stamp, query)
+
+
+def _is_fresh(prefix, now):
+    # Tags look like <prefix>.<valid-until epoch or "x" when interest is not accruing>
+    for tag in request.if_none_match.as_set():
+        head, _, valid_until = tag.rpartition('.')
+        if head == prefix and (valid_until == 'x' or (valid_until.isdigit() and _epoch(now) < int(valid_until))):
+            return True
+    return False
+
+
+def conditional(kind):
+    """
+    Wrap a view returning ``(payload, valid_until)`` with ETag/304 handling and the
+    per-user render cache. ``valid_until`` is when the payload goes stale without a
+    ledger change (None = never).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if current_user.user_data.get('is_admin'):
+                return jsonify(error='Not available for admin accounts'), 403
+            now = datetime.utcnow()
+            settings = current_settings()
+            key = _cache_key(kind, settings)
+            prefix = '.'.join(str(part) for part in key)
+            if _is_fresh(prefix, now):
+                return '', 304
+            cached = render_cache.get(key, now)
+            if cached is None:
+                payload, valid_until = f(settings, now, *args, **kwargs)
+                body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+                render_cache.set(key, body, valid_until)
+            else:
+                body, valid_until = cached
+            response = Response(body, mimetype='application/json')
+            response.set_etag(f"{prefix}.{_epoch(valid_until) if valid_until else 'x'}")
+            # Let the browser keep the body but always revalidate it
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated
+    return decorator
+
+
+@bp.route('/wallet')
+@login_required
+@conditional('wallet')
+def wallet(settings, now):
+    deposits, withdrawals = load_ledger(current_user.id)
+    interest = interest_daily(deposits, settings.get('interest_rate', 25.0), now)
+    withdrawn = approved_total(withdrawals)
+    held = approved_total(withdrawals, ('approved', 'pending'))
+    return {
+        'balance': round(interest - withdrawn, 2),
+        'withdrawable': round(interest - held, 2),
+        'interest': round(interest, 2),
+        'deposited': round(approved_total(deposits), 2),
+        'withdrawn': round(withdrawn, 2),
+        'pending_withdrawn': round(held - withdrawn, 2),
+    }, next_accrual(deposits, now)
+
+
+@bp.route('/summary')
+@login_required
+@conditional('summary')
+def summary(settings, now):
+    deposits, withdrawals = load_ledger(current_user.id)
+    interest = interest_annual(deposits, settings.get('interest_rate', 8.0), now)
+    return {
+        'balance': round(interest, 2),
+        'interest': round(interest, 2),
+        'deposited': round(approved_total(deposits), 2),
+        'withdrawn': round(approved_total(withdrawals), 2),
+    }, next_accrual(deposits, now)
+
+
+@bp.route('/history')
+@login_required
+@conditional('history')
+def history(settings, now):
+    page = max(request.args.get('page', 1, type=int), 1)
+    history, has_more = load_history_page(current_user.id, page, HISTORY_PAGE_SIZE)
+    # Row arrays with a shared header keep long histories compact
+    rows = [
+        [h['id'], h['type'], h['amount'], h['status'], h['date'].strftime('%Y-%m-%d') if h['date'] else None, h['note'] or '']
+        for h in history
+    ]
+    return {'fields': ['id', 'type', 'amount', 'status', 'date', 'note'], 'rows': rows, 'page': page, 'has_more': has_more}, None
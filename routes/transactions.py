@@ -7,6 +7,7 @@ from werkzeug.utils import secure_filename
 from bson import ObjectId
 from datetime import datetime
 from extensions import db, calculate_simple_interest
+from archive import find_with_archive
 import os
 
 # Blueprint for deposit and withdrawal routes
@@ -22,8 +23,8 @@ def transactions_report():
     # Fetch all users
     users = list(db.users.find())
     # Fetch all deposits and withdrawals
-    deposits = list(db.deposits.find())
-    withdrawals = list(db.withdrawals.find())
+    deposits = list(find_with_archive('deposits'))
+    withdrawals = list(find_with_archive('withdrawals'))
     # Prepare CSV
     def generate():
         yield 'User Name,Email,Type,Amount,Status,Date,Note\n'
@@ -40,6 +41,7 @@ from werkzeug.utils import secure_filename
 from bson import ObjectId
 from datetime import datetime
 from extensions import db, calculate_simple_interest
+from ledger import bump_ledger_version, load_ledger, current_settings, approved_total, interest_daily
 import os
 
 # Blueprint for deposit and withdrawal routes
@@ -73,6 +75,7 @@ def deposit():
 
         expected_return = calculate_simple_interest(amount, interest_rate, days/365)
 
+        now = datetime.utcnow()
         deposit = {
             'user_id': ObjectId(current_user.id),
             'amount': amount,
@@ -80,10 +83,12 @@ def deposit():
             'interest_rate': interest_rate,
             'expected_return': expected_return,
             'status': 'pending',
-            'submitted_at': datetime.utcnow()
+            'submitted_at': now,
+            'updated_at': now
         }
 
         result = db.deposits.insert_one(deposit)
+        bump_ledger_version(current_user.id)
         return redirect(url_for('transactions.upload_proof', deposit_id=str(result.inserted_id)))
 
     # Pass current interest rate to template for display
@@ -120,10 +125,12 @@ def upload_proof(deposit_id):
                     '$set': {
                         'screenshot_url': f"uploads/{filename}",
                         'product_id': request.form['product_id'],
-                        'note': request.form.get('note', '')
+                        'note': request.form.get('note', ''),
+                        'updated_at': datetime.utcnow()
                     }
                 }
             )
+            bump_ledger_version(current_user.id)
             flash('Proof uploaded successfully')
             return redirect(url_for('dashboard'))
             
@@ -149,22 +156,10 @@ def withdraw():
             flash('Minimum withdrawal amount is 500.')
             return redirect(url_for('transactions.withdraw'))
 
-        deposits = list(db.deposits.find({'user_id': ObjectId(current_user.id)}))
-        withdrawals = list(db.withdrawals.find({'user_id': ObjectId(current_user.id)}))
-        from datetime import datetime as dt
-        now = dt.utcnow()
-        real_time_interest = 0
-        for d in deposits:
-            if d.get('status') == 'approved':
-                settings = db.settings.find_one() or {'interest_rate': 25.0}
-                rate = settings.get('interest_rate', 25.0)
-                principal = d.get('amount', 0)
-                start = d.get('submitted_at')
-                if start:
-                    elapsed = (now - start).days
-                    real_time_interest += (principal * rate / 100) * elapsed
+        deposits, withdrawals = load_ledger(current_user.id)
+        real_time_interest = interest_daily(deposits, current_settings().get('interest_rate', 25.0), datetime.utcnow())
         # Hold all pending and approved withdrawals
-        total_withdrawal = sum(w['amount'] for w in withdrawals if w.get('status') in ['approved', 'pending'])
+        total_withdrawal = approved_total(withdrawals, ('approved', 'pending'))
         wallet_balance = real_time_interest - total_withdrawal
 
         if amount <= 0:
@@ -174,35 +169,21 @@ def withdraw():
             flash(f'You can only withdraw up to your total available balance: ₹{wallet_balance:.2f}')
             return redirect(url_for('transactions.withdraw'))
 
+        now = datetime.utcnow()
         withdrawal = {
             'user_id': ObjectId(current_user.id),
             'amount': amount,
             'note': note,
             'account_info': account_info,
             'status': 'pending',
-            'requested_at': datetime.utcnow()
+            'requested_at': now,
+            'updated_at': now
         }
 
         db.withdrawals.insert_one(withdrawal)
+        bump_ledger_version(current_user.id)
         flash('Withdrawal request submitted')
         return redirect(url_for('dashboard'))
 
-    # Calculate wallet_balance for template (interest only, principal is non-refundable)
-    deposits = list(db.deposits.find({'user_id': ObjectId(current_user.id)}))
-    withdrawals = list(db.withdrawals.find({'user_id': ObjectId(current_user.id)}))
-    from datetime import datetime as dt
-    now = dt.utcnow()
-    real_time_interest = 0
-    for d in deposits:
-        if d.get('status') == 'approved':
-            settings = db.settings.find_one() or {'interest_rate': 25.0}
-            rate = settings.get('interest_rate', 25.0)
-            principal = d.get('amount', 0)
-            start = d.get('submitted_at')
-            if start:
-                elapsed = (now - start).days
-                real_time_interest += (principal * rate / 100) * elapsed
-    total_withdrawal = sum(w['amount'] for w in withdrawals if w.get('status') in ['approved', 'pending'])
-    total_deposit = sum(d['amount'] for d in deposits if d.get('status') == 'approved')
-    wallet_balance = real_time_interest - total_withdrawal
-    return render_template('withdraw.html', wallet_balance=wallet_balance, real_time_interest=real_time_interest, total_deposit=total_deposit, total_withdrawal=total_withdrawal)
+    # Available balance is filled in by main.js from /api/v1/wallet
+    return render_template('withdraw.html')
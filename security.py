@@ -0,0 +1,138 @@
+"""
+Login hardening for the auth routes (login, admin_login, register).
+Token-bucket rate limiting keyed by client IP and email, with an in-memory
+backend (per worker) or a Redis backend shared by all workers, and password
+hashing limited to a few concurrent slots per worker. A request that finds no
+free slot fails at once with HashBusy (503), so a login flood can never hold
+more than HASH_SLOTS of the worker's threads.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from werkzeug.security import generate_password_hash, check_password_hash
+from extensions import thread_share
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Method string as stored in the hash prefix; raise the iteration count to
+# strengthen hashes, existing users are upgraded on their next login.
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:260000')
+HASH_SLOTS = thread_share('HASH_SLOTS')
+
+# scope -> key kind -> (capacity, seconds to refill the whole bucket)
+LIMITS = {
+    'login': {'ip': (20, 60), 'email': (5, 300)},
+    'admin_login': {'ip': (10, 60), 'email': (5, 300)},
+    'register': {'ip': (5, 600)},
+}
+
+
+class HashBusy(Exception):
+    """Raised when every hashing slot is in use."""
+
+
+class MemoryBackend:
+    """Token buckets in process memory; limits apply per gunicorn worker."""
+
+    MAX_KEYS = 100000
+
+    def __init__(self):
+        self._buckets = OrderedDict()  # least recently used first
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.MAX_KEYS:
+                # Forget the least recently used bucket; O(1) even when all are recent
+                self._buckets.popitem(last=False)
+            return allowed
+
+
+class RedisBackend:
+    """Token buckets in Redis, shared by every worker pointing at the same server."""
+
+    SCRIPT = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate))
+return allowed
+"""
+
+    def __init__(self, url):
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def take(self, key, capacity, rate, now):
+        return bool(self._script(keys=[f'ratelimit:{key}'], args=[capacity, rate, now]))
+
+
+def _make_backend():
+    url = os.getenv('RATELIMIT_STORAGE_URL', '')
+    if url.startswith('redis://') or url.startswith('rediss://'):
+        if redis is None:
+            print('RATELIMIT_STORAGE_URL is set but redis is not installed; using in-memory rate limits.')
+        else:
+            return RedisBackend(url)
+    return MemoryBackend()
+
+
+backend = _make_backend()
+
+
+def allow_attempt(scope, ip, email=None):
+    """Take a token for each key of ``scope``; False means reject the request."""
+    now = time.time()
+    keys = {'ip': ip, 'email': (email or '').strip().lower()}
+    allowed = True
+    for kind, (capacity, per_seconds) in LIMITS[scope].items():
+        if not keys.get(kind):
+            continue
+        # Check every bucket so an IP flood also drains the per-email budget
+        if not backend.take(f'{scope}:{kind}:{keys[kind]}', capacity, capacity / per_seconds, now):
+            allowed = False
+    return allowed
+
+
+_hash_slots = threading.BoundedSemaphore(HASH_SLOTS)
+
+
+def _run_bounded(fn, *args):
+    # Never wait for a slot: a waiting request would hold its thread just the same
+    if not _hash_slots.acquire(blocking=False):
+        raise HashBusy()
+    try:
+        return fn(*args)
+    finally:
+        _hash_slots.release()
+
+
+def hash_password(password):
+    return _run_bounded(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+
+def verify_password(pwhash, password):
+    return _run_bounded(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    return pwhash.split('$', 1)[0] != PASSWORD_HASH_METHOD
@@ -94,3 +94,175 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 });
+
+// Live admin queues: apply rows pushed by the server instead of reloading the page
+document.addEventListener('DOMContentLoaded', function() {
+    const tbody = document.querySelector('tbody[data-live-stream]');
+    if (!tbody || !window.EventSource) {
+        return;
+    }
+    const source = new EventSource(tbody.dataset.liveStream);
+
+    source.addEventListener('row', function(e) {
+        const payload = JSON.parse(e.data);
+        // Row HTML is rendered (and escaped) by the server-side row template
+        const template = document.createElement('template');
+        template.innerHTML = payload.html.trim();
+        const row = template.content.firstElementChild;
+        const existing = tbody.querySelector('tr[data-id="' + payload.id + '"]');
+        if (existing) {
+            existing.replaceWith(row);
+        } else {
+            const empty = tbody.querySelector('tr.live-empty');
+            if (empty) {
+                empty.remove();
+            }
+            tbody.insertBefore(row, tbody.firstChild);
+        }
+    });
+
+    source.addEventListener('remove', function(e) {
+        const payload = JSON.parse(e.data);
+        const existing = tbody.querySelector('tr[data-id="' + payload.id + '"]');
+        if (existing) {
+            existing.remove();
+        }
+    });
+});
+
+// API-backed user pages: fill [data-api] fields and [data-api-history] tables from /api/v1
+// and refresh them in place. cache: 'no-cache' makes the browser revalidate with
+// If-None-Match, so unchanged data comes back as a 304 and is served from its cache.
+document.addEventListener('DOMContentLoaded', function() {
+    const fieldContainers = document.querySelectorAll('[data-api]');
+    const historyBodies = document.querySelectorAll('tbody[data-api-history]');
+    if (!fieldContainers.length && !historyBodies.length) {
+        return;
+    }
+
+    function fetchJSON(url) {
+        return fetch(url, { credentials: 'same-origin', cache: 'no-cache', headers: { 'Accept': 'application/json' } })
+            .then(function(response) {
+                if (!response.ok) {
+                    throw new Error('Request failed: ' + response.status);
+                }
+                return response.json();
+            });
+    }
+
+    function fillFields(container, data) {
+        container.querySelectorAll('[data-field]').forEach(function(el) {
+            const value = data[el.dataset.field];
+            if (typeof value === 'number') {
+                el.textContent = value.toFixed(2);
+            }
+        });
+        container.querySelectorAll('[data-max-field]').forEach(function(input) {
+            const value = data[input.dataset.maxField];
+            if (typeof value === 'number') {
+                input.max = value.toFixed(2);
+            }
+        });
+    }
+
+    function cell(text) {
+        const td = document.createElement('td');
+        td.textContent = text;
+        return td;
+    }
+
+    function fillHistory(tbody, data, append) {
+        const index = {};
+        data.fields.forEach(function(name, i) { index[name] = i; });
+        const rows = data.rows.map(function(row) {
+            const status = row[index.status];
+            const tr = document.createElement('tr');
+            tr.appendChild(cell(row[index.type]));
+            tr.appendChild(cell('₹' + Number(row[index.amount]).toFixed(2)));
+            const badge = document.createElement('span');
+            badge.className = 'badge bg-' + (status === 'approved' ? 'success' : status === 'pending' ? 'warning' : 'danger');
+            badge.textContent = status;
+            const statusCell = document.createElement('td');
+            statusCell.appendChild(badge);
+            tr.appendChild(statusCell);
+            tr.appendChild(cell(row[index.note] || '-'));
+            tr.appendChild(cell(row[index.date] || '-'));
+            return tr;
+        });
+        if (!rows.length && !append) {
+            const empty = cell('No transactions yet');
+            empty.colSpan = 5;
+            empty.className = 'text-center';
+            const tr = document.createElement('tr');
+            tr.appendChild(empty);
+            rows.push(tr);
+        }
+        // Older pages are served from the archive once they reach past recent transactions
+        if (data.has_more) {
+            const button = document.createElement('button');
+            button.type = 'button';
+            button.className = 'btn btn-sm btn-outline-secondary';
+            button.textContent = 'Show older transactions';
+            button.addEventListener('click', function() {
+                button.disabled = true;
+                const url = tbody.dataset.apiHistory + '?page=' + (data.page + 1);
+                fetchJSON(url).then(function(next) {
+                    fillHistory(tbody, next, true);
+                    tbody.dataset.pages = next.page;
+                }).catch(console.error);
+            });
+            const moreCell = document.createElement('td');
+            moreCell.colSpan = 5;
+            moreCell.className = 'text-center';
+            moreCell.appendChild(button);
+            const moreRow = document.createElement('tr');
+            moreRow.className = 'api-more';
+            moreRow.appendChild(moreCell);
+            rows.push(moreRow);
+        }
+        if (append) {
+            const previous = tbody.querySelector('tr.api-more');
+            if (previous) {
+                previous.remove();
+            }
+            tbody.append.apply(tbody, rows);
+        } else {
+            tbody.replaceChildren.apply(tbody, rows);
+        }
+    }
+
+    function refresh() {
+        fieldContainers.forEach(function(container) {
+            fetchJSON(container.dataset.api).then(function(data) { fillFields(container, data); }).catch(console.error);
+        });
+        historyBodies.forEach(function(tbody) {
+            // Refetch every page already shown so older pages are not collapsed back to page 1;
+            // unchanged pages revalidate as 304s
+            const pages = [];
+            for (let page = 1; page <= Number(tbody.dataset.pages || 1); page++) {
+                pages.push(fetchJSON(tbody.dataset.apiHistory + '?page=' + page));
+            }
+            Promise.all(pages).then(function(results) {
+                fillHistory(tbody, results[0]);
+                let shown = 1;
+                while (shown < results.length && results[shown - 1].has_more) {
+                    fillHistory(tbody, results[shown], true);
+                    shown++;
+                }
+                tbody.dataset.pages = shown;
+            }).catch(console.error);
+        });
+    }
+
+    refresh();
+    setInterval(function() {
+        if (document.visibilityState === 'visible') {
+            refresh();
+        }
+    }, 60000);
+    document.addEventListener('visibilitychange', function() {
+        if (document.visibilityState === 'visible') {
+            refresh();
+        }
+    });
+});